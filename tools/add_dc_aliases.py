@@ -1,8 +1,13 @@
 import json
+import os
 from pathlib import Path
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 p = Path('data/facility_aliases.json')
-js = json.loads(p.read_text())
+js = orjson.loads(p.read_bytes()) if orjson is not None else json.loads(p.read_text())
 
 new_aliases = {
     "medstar whc": "medstar-washington-hospital-center",
@@ -23,8 +28,14 @@ for k, v in new_aliases.items():
         changed = True
 
 if changed:
-    # write back with consistent formatting
-    p.write_text(json.dumps(js, indent=2, ensure_ascii=False))
+    # write back with consistent formatting; write a sibling file and move it
+    # into place so an interrupted run never leaves a truncated alias map
+    tmp = p.with_name(p.name + '.NEW')
+    if orjson is not None:
+        tmp.write_bytes(orjson.dumps(js, option=orjson.OPT_INDENT_2))
+    else:
+        tmp.write_text(json.dumps(js, indent=2, ensure_ascii=False))
+    os.replace(tmp, p)
     print('Updated facility_aliases.json - added', sum(1 for k in new_aliases if k in js))
 else:
     print('No changes needed')
@@ -9,6 +9,7 @@ Behavior:
 - Reads data/external_facilities.enriched.json, applies registry matches to set `specializations.carf_accreditations.brain_injury.value` and optional overrides, and writes a new snapshot with suffix `.carf.json` and a small CSV report in `tools/carf_lookup_report.csv`.
 """
 import csv
+import heapq
 import json
 import os
 from pathlib import Path
@@ -18,6 +19,17 @@ try:
     HAVE_RAPIDFUZZ = True
 except Exception:
     HAVE_RAPIDFUZZ = False
+try:
+    # process.cdist scores a whole query x choice matrix in C but needs numpy
+    import numpy  # noqa: F401
+    from rapidfuzz.process import cdist
+    HAVE_CDIST = HAVE_RAPIDFUZZ
+except Exception:
+    HAVE_CDIST = False
+try:
+    import orjson
+except Exception:
+    orjson = None
 import re
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -35,11 +47,14 @@ def load_local_registry(path):
         reader = csv.DictReader(f)
         for r in reader:
             # normalize
+            name = (r.get('name') or '').strip()
             regs.append({
-                'name': (r.get('name') or '').strip(),
+                'name': name,
                 'carf_brain_injury': (r.get('carf_brain_injury') or '').strip().lower() in ('1','true','yes'),
                 'average_therapy_hours': float(r.get('average_therapy_hours') or 0) if r.get('average_therapy_hours') else None,
-                'level_of_care': (r.get('level_of_care') or '').strip() or None
+                'level_of_care': (r.get('level_of_care') or '').strip() or None,
+                # cached once here instead of re-normalizing per facility comparison
+                '_name_tokens': text_tokens(name),
             })
     return regs
 
@@ -52,6 +67,9 @@ def normalize_text(s):
     s = re.sub(r"\s+", ' ', s).strip()
     return s
 
+def text_tokens(s):
+    return frozenset(normalize_text(s).split())
+
 def similar(a, b):
     if HAVE_RAPIDFUZZ:
         try:
@@ -62,6 +80,20 @@ def similar(a, b):
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
 
+def similarity_matrix(queries, choices):
+    """Return `similar(q, c)` for every query x choice pair as a list of rows.
+
+    With RapidFuzz (and numpy) available the whole matrix is computed by
+    `process.cdist` in one call instead of one Python-level call per pair.
+    """
+    if HAVE_CDIST and queries and choices:
+        try:
+            return cdist(queries, choices, scorer=fuzz.token_sort_ratio, dtype=float, workers=-1) / 100.0
+        except Exception:
+            pass
+    return [[similar(q, c) for c in choices] for q in queries]
+
+
 def rapidfuzz_combined(a, b):
     """Combined RapidFuzz-based score (0.0 - 1.0). Falls back to SequenceMatcher when RapidFuzz missing.
 
@@ -82,121 +114,170 @@ def rapidfuzz_combined(a, b):
         return similar(a, b)
 
 def token_overlap_score(a, b):
-    A = set(normalize_text(a).split())
-    B = set(normalize_text(b).split())
+    return token_set_overlap(text_tokens(a), text_tokens(b))
+
+def token_set_overlap(A, B):
+    """token_overlap_score for already-normalized token sets."""
     if not A or not B:
         return 0.0
     inter = A.intersection(B)
     return len(inter) / max(len(A), len(B))
 
 
-def find_registry_matches(name, aliases, regs, top_n=3):
+def build_token_index(regs):
+    """Map each normalized registry token to the indices of rows containing it."""
+    index = {}
+    for i, r in enumerate(regs):
+        reg_tokens = r.get('_name_tokens')
+        if reg_tokens is None:
+            reg_tokens = text_tokens(r['name'])
+        for tok in reg_tokens:
+            index.setdefault(tok, set()).add(i)
+    return index
+
+
+def match_text(name, aliases):
+    return (name or '') + ' ' + ' '.join(aliases or [])
+
+
+def find_registry_matches(name, aliases, regs, top_n=3, text_sims=None, name_sims=None, token_index=None):
     """Return up to top_n candidate registry rows with scores (sorted desc).
 
     This computes both sequence-similarity and token-overlap and returns
     a list of tuples (score, registry_row). The caller can decide whether to
     auto-apply a match or surface it for manual review.
+
+    `text_sims` / `name_sims` are optional precomputed rows of
+    `similarity_matrix` (one score per registry row) for the combined
+    name+aliases text and for the bare name respectively. `token_index`
+    (from `build_token_index`) lets token overlap be skipped for rows that
+    share no token with the facility; their similarity is still scored.
     """
     if not name and not aliases:
         return []
+    text = match_text(name, aliases)
+    tokens = text_tokens(text)
+    if text_sims is None:
+        text_sims = [similar(text, r['name']) for r in regs]
+    if name_sims is None:
+        name_sims = [similar(name or '', r['name']) for r in regs]
+    sharing = None
+    if token_index is not None:
+        sharing = set()
+        for tok in tokens:
+            sharing.update(token_index.get(tok, ()))
     candidates = []
-    text = (name or '') + ' ' + ' '.join(aliases or [])
-    for r in regs:
-        score_sim = max(similar(text, r['name']), similar(name or '', r['name']))
-        score_tok = token_overlap_score(text, r['name'])
+    for i, (r, sim_text, sim_name) in enumerate(zip(regs, text_sims, name_sims)):
+        score_sim = max(sim_text, sim_name)
+        if sharing is not None and i not in sharing:
+            # no common token: overlap is 0 without building the intersection
+            score_tok = 0.0
+        else:
+            reg_tokens = r.get('_name_tokens')
+            if reg_tokens is None:
+                reg_tokens = text_tokens(r['name'])
+            score_tok = token_set_overlap(tokens, reg_tokens)
         score = max(score_sim, score_tok)
-        candidates.append((score, r))
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    return candidates[:top_n]
+        candidates.append((float(score), r))
+    # nlargest is equivalent to a stable sort + slice, without sorting every row
+    return heapq.nlargest(top_n, candidates, key=lambda x: x[0])
 
 
 def apply_registry(regs):
-    data = json.loads(ENRICHED.read_text(encoding='utf-8'))
-    report_rows = []
-    suggestion_rows = []
+    if orjson is not None:
+        data = orjson.loads(ENRICHED.read_bytes())
+    else:
+        data = json.loads(ENRICHED.read_text(encoding='utf-8'))
     updated = 0
 
     # thresholds
     AUTO_APPLY_THRESHOLD = 0.75  # auto-apply only high-confidence matches
     SUGGESTION_MIN = 0.3         # surface candidates above this for review
 
+    names = []
     for f in data:
-        name = ''
         if isinstance(f.get('name'), dict):
-            name = f['name'].get('value') or ''
+            names.append(f['name'].get('value') or '')
         else:
-            name = f.get('name') or ''
-        aliases = f.get('alias_names') or []
+            names.append(f.get('name') or '')
+    # score every facility against every registry row up front
+    reg_names = [r['name'] for r in regs]
+    text_sims = similarity_matrix([match_text(n, f.get('alias_names')) for n, f in zip(names, data)], reg_names)
+    name_sims = similarity_matrix(names, reg_names)
+    token_index = build_token_index(regs)
 
-        candidates = find_registry_matches(name, aliases, regs, top_n=5)
-        top_score = candidates[0][0] if candidates else 0
-        top_match = candidates[0][1] if candidates else None
+    # both CSVs are written row by row while facilities are matched
+    REPORT.parent.mkdir(parents=True, exist_ok=True)
+    SUGG = REPORT.parent / 'carf_lookup_suggestions.csv'
+    with REPORT.open('w', newline='', encoding='utf-8') as csvf, \
+            SUGG.open('w', newline='', encoding='utf-8') as sf:
+        report = csv.writer(csvf)
+        report.writerow(['id','name','matched','match_score','carf_before','carf_after'])
+        suggestions = csv.writer(sf)
+        suggestions.writerow(['id', 'facility_name', 'candidate_name', 'score', 'candidate_carf', 'candidate_therapy_hours'])
+
+        for i, f in enumerate(data):
+            name = names[i]
+            aliases = f.get('alias_names') or []
+
+            candidates = find_registry_matches(name, aliases, regs, top_n=5,
+                                               text_sims=text_sims[i], name_sims=name_sims[i],
+                                               token_index=token_index)
+            top_score = candidates[0][0] if candidates else 0
+            top_match = candidates[0][1] if candidates else None
 
-        carf_before = False
-        try:
-            carf_before = bool(f['specializations']['carf_accreditations']['brain_injury']['value'])
-        except Exception:
             carf_before = False
+            try:
+                carf_before = bool(f['specializations']['carf_accreditations']['brain_injury']['value'])
+            except Exception:
+                carf_before = False
+
+            applied = False
+            # Auto-apply only very confident matches
+            if top_match and top_score >= AUTO_APPLY_THRESHOLD:
+                match = top_match
+                # apply
+                spec = f.setdefault('specializations', {})
+                carf = spec.setdefault('carf_accreditations', {})
+                brain = carf.setdefault('brain_injury', {})
+                if match.get('carf_brain_injury'):
+                    brain['value'] = True
+                # optionally override therapy hours and level_of_care if provided
+                pd = f.setdefault('program_details', {})
+                if match.get('average_therapy_hours'):
+                    pd['average_therapy_hours_per_day'] = {'value': match['average_therapy_hours']}
+                if match.get('level_of_care'):
+                    f['level_of_care'] = match['level_of_care']
+                applied = True
+                updated += 1
 
-        applied = False
-        # Auto-apply only very confident matches
-        if top_match and top_score >= AUTO_APPLY_THRESHOLD:
-            match = top_match
-            # apply
-            spec = f.setdefault('specializations', {})
-            carf = spec.setdefault('carf_accreditations', {})
-            brain = carf.setdefault('brain_injury', {})
-            if match.get('carf_brain_injury'):
-                brain['value'] = True
-            # optionally override therapy hours and level_of_care if provided
-            pd = f.setdefault('program_details', {})
-            if match.get('average_therapy_hours'):
-                pd['average_therapy_hours_per_day'] = {'value': match['average_therapy_hours']}
-            if match.get('level_of_care'):
-                f['level_of_care'] = match['level_of_care']
-            applied = True
-            updated += 1
-
-        # Prepare report row
-        report_rows.append({
-            'id': f.get('id'),
-            'name': name,
-            'matched': bool(candidates),
-            'match_score': round(top_score, 2),
-            'carf_before': carf_before,
-            'carf_after': bool(f.get('specializations', {}).get('carf_accreditations', {}).get('brain_injury', {}).get('value'))
-        })
-
-        # If there are candidate matches above SUGGESTION_MIN, write them to suggestions CSV
-        for score, m in candidates:
-            if score >= SUGGESTION_MIN:
-                suggestion_rows.append({
-                    'id': f.get('id'),
-                    'facility_name': name,
-                    'candidate_name': m.get('name'),
-                    'score': round(score, 3),
-                    'candidate_carf': m.get('carf_brain_injury'),
-                    'candidate_therapy_hours': m.get('average_therapy_hours')
-                })
+            # Write report row
+            report.writerow((
+                f.get('id'),
+                name,
+                bool(candidates),
+                round(top_score, 2),
+                carf_before,
+                bool(f.get('specializations', {}).get('carf_accreditations', {}).get('brain_injury', {}).get('value')),
+            ))
+
+            # If there are candidate matches above SUGGESTION_MIN, write them to suggestions CSV
+            for score, m in candidates:
+                if score >= SUGGESTION_MIN:
+                    suggestions.writerow((
+                        f.get('id'),
+                        name,
+                        m.get('name'),
+                        round(score, 3),
+                        m.get('carf_brain_injury'),
+                        m.get('average_therapy_hours'),
+                    ))
 
     # write outputs
-    OUT_JSON.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
-    REPORT.parent.mkdir(parents=True, exist_ok=True)
-    with REPORT.open('w', newline='', encoding='utf-8') as csvf:
-        fieldnames = ['id','name','matched','match_score','carf_before','carf_after']
-        writer = csv.DictWriter(csvf, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in report_rows:
-            writer.writerow(r)
-
-    # suggestions file
-    SUGG = REPORT.parent / 'carf_lookup_suggestions.csv'
-    with SUGG.open('w', newline='', encoding='utf-8') as sf:
-        fieldnames = ['id', 'facility_name', 'candidate_name', 'score', 'candidate_carf', 'candidate_therapy_hours']
-        writer = csv.DictWriter(sf, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in suggestion_rows:
-            writer.writerow(r)
+    if orjson is not None:
+        OUT_JSON.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        OUT_JSON.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
 
     print(f'Wrote updated enriched snapshot: {OUT_JSON} and report {REPORT} (auto-applied {updated} records)')
     print(f'Wrote candidate suggestions: {SUGG} (inspect and apply manually or adjust thresholds)')
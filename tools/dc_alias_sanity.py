@@ -5,6 +5,10 @@ Usage: python tools/dc_alias_sanity.py
 import json
 import os
 import re
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 ALIAS_PATH = os.path.join(ROOT, 'data', 'facility_aliases.json')
@@ -14,23 +18,41 @@ def main():
     if not os.path.exists(ALIAS_PATH):
         print('Missing', ALIAS_PATH)
         return 2
-    with open(ALIAS_PATH, 'r', encoding='utf-8') as f:
-        aliases = json.load(f)
+    if orjson is not None:
+        with open(ALIAS_PATH, 'rb') as f:
+            aliases = orjson.loads(f.read())
+    else:
+        with open(ALIAS_PATH, 'r', encoding='utf-8') as f:
+            aliases = json.load(f)
     keys = list(aliases.keys())
     check_tokens = [
         'medstar', 'gw', 'gwuh', 'george washington', 'sibley', 'holy cross',
         'inova', 'inova fairfax', 'children', "children's national",
         'washington dc', 'dc', 'd.c.', 'district of columbia'
     ]
-    found = {}
-    for t in check_tokens:
-        rx = re.compile(re.escape(t), re.I)
-        matches = [k for k in keys if rx.search(k)]
-        found[t] = {'count': len(matches), 'examples': matches[:10]}
+    # one combined pattern rejects non-matching keys in a single pass; keys that
+    # hit are then tallied against every token (tokens overlap, e.g. 'dc' and
+    # 'washington dc', so a key can count towards several checks)
+    any_token = re.compile('|'.join(re.escape(t) for t in check_tokens), re.I)
+    found = {t: {'count': 0, 'examples': []} for t in check_tokens}
+    for k in keys:
+        if not any_token.search(k):
+            continue
+        k_low = k.lower()
+        for t in check_tokens:
+            if t in k_low:
+                v = found[t]
+                v['count'] += 1
+                if len(v['examples']) < 10:
+                    v['examples'].append(k)
     summary = {'total_aliases': len(keys), 'checks': found}
     os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    with open(OUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(summary, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        with open(OUT_PATH, 'wb') as f:
+            f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    else:
+        with open(OUT_PATH, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
     print('Wrote', OUT_PATH)
     print('Total aliases:', len(keys))
     for t, v in found.items():
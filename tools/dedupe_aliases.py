@@ -1,16 +1,32 @@
 import re
 import json
+import os
 from pathlib import Path
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 p = Path('C:/Users/smallick/PycharmProjects/LTACH/data/facility_aliases.json')
 s = p.read_text(encoding='utf-8')
-# regex to find "key": "value" (allow spaces)
-pairs = re.findall(r'"([^"]+)"\s*:\s*"([^"]+)"', s)
-# pairs will include many entries; keep last occurrence
-mapping = {}
-for k, v in pairs:
-    mapping[k] = v
-# write pretty JSON
-out = json.dumps(mapping, indent=2, ensure_ascii=False, sort_keys=False)
-p.write_text(out, encoding='utf-8')
+# the JSON parser already keeps the last occurrence of a duplicated key
+try:
+    mapping = orjson.loads(s) if orjson is not None else json.loads(s)
+except ValueError:
+    mapping = None
+if not isinstance(mapping, dict):
+    # malformed file: fall back to scraping "key": "value" pairs (allow spaces)
+    pairs = re.findall(r'"([^"]+)"\s*:\s*"([^"]+)"', s)
+    # pairs will include many entries; keep last occurrence
+    mapping = {}
+    for k, v in pairs:
+        mapping[k] = v
+# write pretty JSON to a sibling file, then move it into place
+tmp = p.with_name(p.name + '.NEW')
+if orjson is not None:
+    tmp.write_bytes(orjson.dumps(mapping, option=orjson.OPT_INDENT_2))
+else:
+    out = json.dumps(mapping, indent=2, ensure_ascii=False, sort_keys=False)
+    tmp.write_text(out, encoding='utf-8')
+os.replace(tmp, p)
 print(f'Wrote cleaned aliases ({len(mapping)} entries) to {p}')
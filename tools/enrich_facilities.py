@@ -16,21 +16,60 @@ Run with: python tools/enrich_facilities.py
 """
 import json
 import csv
+import filecmp
+import os
+import pickle
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 ROOT = Path('C:/Users/smallick/PycharmProjects/LTACH')
 EXT = ROOT / 'data' / 'external_facilities.json'
 ALIASES = ROOT / 'data' / 'facility_aliases.json'
 OUT_CSV = ROOT / 'tools' / 'facility_enrichment.csv'
 OUT_JSON = ROOT / 'data' / 'external_facilities.enriched.json'
+REV_CACHE = ROOT / 'tools' / '.cache' / 'facility_aliases.rev.pkl'
+# enrichment fans out to worker processes only for datasets large enough to
+# amortize process start-up and pickling records back and forth
+PARALLEL_MIN_RECORDS = 5000
+PARALLEL_CHUNKSIZE = 256
 
-ext = json.loads(EXT.read_text(encoding='utf-8'))
-alias_map = json.loads(ALIASES.read_text(encoding='utf-8'))
+def load_json(path):
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding='utf-8'))
 
-# reverse map: slug -> [aliases]
-rev = {}
-for a, slug in alias_map.items():
-    rev.setdefault(slug, []).append(a)
+def load_alias_reverse_index():
+    # reverse map: slug -> (aliases,); read-only once built, so freeze to tuples.
+    # Cached as a pickle keyed on the alias file's mtime/size so repeated runs
+    # (e.g. via import_and_enrich.py) skip re-parsing an unchanged alias map.
+    st = ALIASES.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    try:
+        with REV_CACHE.open('rb') as fh:
+            cached_key, cached_rev = pickle.load(fh)
+        if cached_key == key:
+            return cached_rev
+    except Exception:
+        pass
+    alias_map = load_json(ALIASES)
+    rev = defaultdict(list)
+    for a, slug in alias_map.items():
+        rev[slug].append(a)
+    rev = {slug: tuple(names) for slug, names in rev.items()}
+    try:
+        REV_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with REV_CACHE.open('wb') as fh:
+            pickle.dump((key, rev), fh, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    return rev
 
 # heuristics
 def infer_level_of_care(t):
@@ -53,113 +92,173 @@ def infer_is_rehab(t):
     s = t.lower()
     return 'rehab' in s or 'rehabilitation' in s or 'inpatient rehabilitation' in s
 
+DEFAULT_THERAPY_HOURS = {
+    'inpatient_rehabilitation': 3,
+    'rehab': 3,
+    'acute': 2,
+    'community': 1.5,
+    'pediatric': 2,
+    'other': 1.5,
+    'unknown': 1.5
+}
+
 def default_therapy_hours(level):
-    return {
-        'inpatient_rehabilitation': 3,
-        'rehab': 3,
-        'acute': 2,
-        'community': 1.5,
-        'pediatric': 2,
-        'other': 1.5,
-        'unknown': 1.5
-    }.get(level, 1.5)
-
-# enrich copy
-enriched = []
-rows = []
+    return DEFAULT_THERAPY_HOURS.get(level, 1.5)
+
+def ensure_path(d, *keys):
+    # walk/create nested dicts, only allocating a {} where a level is missing
+    cur = d
+    for k in keys:
+        nxt = cur.get(k)
+        if nxt is None:
+            nxt = {}
+            cur[k] = nxt
+        cur = nxt
+    return cur
+
+CSV_FIELDS = ['id','name','type','level_of_care','is_inpatient_rehabilitation','average_therapy_hours_per_day','carf_brain_injury','ventilator_weaning','admissions_phone','website','location','address','zip','aliases']
 # heuristic overrides for well-known providers (name substrings -> therapy hours, carf)
-HIGH_THERAPY_KEYWORDS = ['kessler','rusk','moss','gaylord','shepherd','craig','tirr','shirley','abilitylab','medstar national','encompass']
-CARF_KEYWORDS = ['gaylord','kessler','craig','shepherd','tirr','shirley','abilitylab']
-def apply_provider_overrides(name, aliases, current_ath, current_carf):
-    n = (name or '').lower()
-    alias_text = ' '.join(aliases).lower() if aliases else ''
+HIGH_THERAPY_KEYWORDS = ('kessler','rusk','moss','gaylord','shepherd','craig','tirr','shirley','abilitylab','medstar national','encompass')
+CARF_KEYWORDS = ('gaylord','kessler','craig','shepherd','tirr','shirley','abilitylab')
+# one compiled alternation per keyword list, so each record is scanned once per list
+HIGH_THERAPY_RE = re.compile('|'.join(map(re.escape, HIGH_THERAPY_KEYWORDS)))
+CARF_RE = re.compile('|'.join(map(re.escape, CARF_KEYWORDS)))
+# name_low / alias_low: the facility name and joined aliases, already lowercased
+def apply_provider_overrides(name_low, alias_low, current_ath, current_carf):
+    # newline keeps a keyword from matching across the name/alias boundary
+    text = name_low + '\n' + alias_low
     ath = current_ath
     carf = current_carf
-    for kw in HIGH_THERAPY_KEYWORDS:
-        if kw in n or kw in alias_text:
-            ath = 3
-            break
-    for kw in CARF_KEYWORDS:
-        if kw in n or kw in alias_text:
-            carf = True
-            break
+    if HIGH_THERAPY_RE.search(text):
+        ath = 3
+    if CARF_RE.search(text):
+        carf = True
     return ath, carf
-for f in ext:
-    slug = f.get('id')
-    name = f.get('name', {}).get('value') if isinstance(f.get('name'), dict) else f.get('name')
-    type_ = f.get('type')
-    level = f.get('level_of_care') or infer_level_of_care(type_)
-    is_rehab = f.get('is_inpatient_rehabilitation') if 'is_inpatient_rehabilitation' in f else infer_is_rehab(type_)
+def enrich_record(f, rev):
+    """Enrich one facility record in place; return it with its CSV row."""
+    f_get = f.get
+    slug = f_get('id')
+    name = f_get('name')
+    if type(name) is dict:
+        name = name.get('value')
+    type_ = f_get('type')
+    level = f_get('level_of_care') or infer_level_of_care(type_)
+    if type(level) is str:
+        # values parsed from the input are a new str per record; the inferred
+        # literals already are interned, so all records share one object per level
+        level = sys.intern(level)
+    is_rehab = f_get('is_inpatient_rehabilitation') if 'is_inpatient_rehabilitation' in f else infer_is_rehab(type_)
     # ensure program_details
-    pd = f.setdefault('program_details', {})
-    ath = None
-    if isinstance(pd.get('average_therapy_hours_per_day'), dict):
-        ath = pd.get('average_therapy_hours_per_day', {}).get('value')
-    else:
-        ath = pd.get('average_therapy_hours_per_day')
+    pd = ensure_path(f, 'program_details')
+    ath = pd.get('average_therapy_hours_per_day')
+    if type(ath) is dict:
+        ath = ath.get('value')
     if ath is None:
         ath = default_therapy_hours(level)
         pd['average_therapy_hours_per_day'] = {'value': ath}
     # ensure carf and vent settings exist before applying provider overrides
-    spec = f.setdefault('specializations', {})
-    carf = spec.setdefault('carf_accreditations', {})
-    brain = carf.setdefault('brain_injury', {})
+    spec = ensure_path(f, 'specializations')
+    brain = ensure_path(spec, 'carf_accreditations', 'brain_injury')
     if 'value' not in brain:
         brain['value'] = False
-    vent = spec.setdefault('ventilator_weaning', {})
+    vent = ensure_path(spec, 'ventilator_weaning')
     if 'is_available' not in vent:
-        vent['is_available'] = {'value': False} if isinstance(vent.get('is_available'), dict) else False
+        vent['is_available'] = False
     # stronger heuristics: if name/aliases indicate rehab or known providers, bump therapy hours or carf
-    aliases_list = f.get('alias_names') or []
-    ath_override, carf_override = apply_provider_overrides(name, aliases_list, ath, brain.get('value'))
+    aliases_list = f_get('alias_names') or []
+    # lowercase once per facility; reused by the override scan and the rehab check below
+    name_low = (name or '').lower()
+    alias_low = ' '.join(aliases_list).lower()
+    ath_override, carf_override = apply_provider_overrides(name_low, alias_low, ath, brain.get('value'))
     if ath_override != ath:
         pd['average_therapy_hours_per_day'] = {'value': ath_override}
         ath = ath_override
     if carf_override is True:
         brain['value'] = True
-        carf = True
     # ensure alias_names
-    aliases = f.get('alias_names') or rev.get(slug) or []
-    f['alias_names'] = sorted(list(set(aliases)))
+    alias_names = sorted(set(aliases_list or rev.get(slug) or []))
+    f['alias_names'] = alias_names
     # normalize contact
-    contact = f.setdefault('contact', {})
+    contact = ensure_path(f, 'contact')
     website = contact.get('website')
     if website and website.startswith('www.'):
         contact['website'] = 'https://' + website.lstrip('/')
     # add inferred fields
     f['level_of_care'] = level
     # if name includes rehab tokens but previous flags missed it, set is_inpatient_rehabilitation
-    name_low = (name or '').lower()
     if not is_rehab and ('rehab' in name_low or 'rehabilitation' in name_low or 'inpatient' in name_low):
         is_rehab = True
     f['is_inpatient_rehabilitation'] = bool(is_rehab)
-    enriched.append(f)
-    rows.append({
-        'id': slug,
-        'name': name,
-        'type': type_ or '',
-        'level_of_care': level,
-        'is_inpatient_rehabilitation': bool(is_rehab),
-        'average_therapy_hours_per_day': ath,
-        'carf_brain_injury': brain.get('value'),
-        'ventilator_weaning': vent.get('is_available') if isinstance(vent.get('is_available'), dict) else vent.get('is_available'),
-        'admissions_phone': contact.get('admissions_phone'),
-        'website': contact.get('website'),
-        'location': f.get('location'),
-        'address': f.get('address'),
-        'zip': f.get('zip'),
-        'aliases': '|'.join(f.get('alias_names') or [])
-    })
-
-# write CSV
-OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-with OUT_CSV.open('w', newline='', encoding='utf-8') as csvf:
-    fieldnames = ['id','name','type','level_of_care','is_inpatient_rehabilitation','average_therapy_hours_per_day','carf_brain_injury','ventilator_weaning','admissions_phone','website','location','address','zip','aliases']
-    writer = csv.DictWriter(csvf, fieldnames=fieldnames)
-    writer.writeheader()
-    for r in rows:
-        writer.writerow(r)
-
-# write enriched JSON snapshot (do not overwrite original)
-OUT_JSON.write_text(json.dumps(enriched, indent=2, ensure_ascii=False), encoding='utf-8')
-print(f'Wrote {OUT_CSV} ({len(rows)} rows) and snapshot {OUT_JSON}')
+    # row values in CSV_FIELDS order
+    row = (
+        slug,
+        name,
+        type_ or '',
+        level,
+        bool(is_rehab),
+        ath,
+        brain.get('value'),
+        vent['is_available'],
+        contact.get('admissions_phone'),
+        contact.get('website'),
+        f_get('location'),
+        f_get('address'),
+        f_get('zip'),
+        '|'.join(alias_names),
+    )
+    return f, row
+
+
+# worker-process state: the alias index is sent once per worker via the
+# pool initializer instead of being pickled with every record
+_worker_rev = None
+
+def _init_worker(rev):
+    global _worker_rev
+    _worker_rev = rev
+
+def _enrich_in_worker(f):
+    return enrich_record(f, _worker_rev)
+
+
+def main():
+    ext = load_json(EXT)
+    rev = load_alias_reverse_index()
+    enriched = []
+    # CSV rows are written as each facility is enriched, no intermediate rows list
+    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    with OUT_CSV.open('w', newline='', encoding='utf-8', buffering=1 << 20) as csvf:
+        writer = csv.writer(csvf)
+        writer.writerow(CSV_FIELDS)
+        if len(ext) >= PARALLEL_MIN_RECORDS:
+            # records are independent once rev is built; map() keeps input order
+            with ProcessPoolExecutor(initializer=_init_worker, initargs=(rev,)) as ex:
+                for f, row in ex.map(_enrich_in_worker, ext, chunksize=PARALLEL_CHUNKSIZE):
+                    enriched.append(f)
+                    writer.writerow(row)
+        else:
+            for f in ext:
+                f, row = enrich_record(f, rev)
+                enriched.append(f)
+                writer.writerow(row)
+
+    # write enriched JSON snapshot (do not overwrite original)
+    tmp_json = OUT_JSON.with_name(OUT_JSON.name + '.NEW')
+    if orjson is not None:
+        tmp_json.write_bytes(orjson.dumps(enriched, option=orjson.OPT_INDENT_2))
+    else:
+        # json.dump streams chunks to the handle instead of building the whole document first
+        with tmp_json.open('w', encoding='utf-8', buffering=1 << 20) as fp:
+            json.dump(enriched, fp, indent=2, ensure_ascii=False)
+    # leave an identical snapshot (and its mtime) untouched
+    if OUT_JSON.exists() and filecmp.cmp(tmp_json, OUT_JSON, shallow=False):
+        tmp_json.unlink()
+        print(f'Wrote {OUT_CSV} ({len(enriched)} rows); snapshot {OUT_JSON} unchanged')
+    else:
+        os.replace(tmp_json, OUT_JSON)
+        print(f'Wrote {OUT_CSV} ({len(enriched)} rows) and snapshot {OUT_JSON}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
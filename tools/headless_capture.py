@@ -1,7 +1,8 @@
 """
 Headless capture helper using Playwright (Python).
 Saves:
- - tools/headless_output.json  (console + network events)
+ - tools/headless_output.jsonl (console + network events, one per line, streamed as they fire)
+ - tools/headless_output.json  (same events in the legacy {kind: [events]} shape)
  - tools/headless_screenshot.png
 
 Run:
@@ -15,6 +16,35 @@ import json
 import os
 import sys
 from pathlib import Path
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+EVENT_KINDS = ('console', 'page_errors', 'requests', 'responses')
+
+
+def write_legacy_json(jsonl_path, json_path, extras):
+    """Transcode the JSONL event stream into the old headless_output.json layout.
+
+    Events are read back one kind at a time, so they are never all held in memory.
+    """
+    with open(json_path, 'w', encoding='utf-8') as out:
+        out.write('{')
+        for i, kind in enumerate(EVENT_KINDS):
+            out.write((',' if i else '') + '\n  ' + json.dumps(kind) + ': [')
+            n = 0
+            with open(jsonl_path, 'rb') as fh:
+                for line in fh:
+                    event = json.loads(line)
+                    if event.pop('kind') != kind:
+                        continue
+                    out.write((',' if n else '') + '\n    ' + json.dumps(event, indent=2).replace('\n', '\n    '))
+                    n += 1
+            out.write('\n  ]' if n else ']')
+        for key, value in extras.items():
+            out.write(',\n  ' + json.dumps(key) + ': ' + json.dumps(value, indent=2).replace('\n', '\n  '))
+        out.write('\n}')
 
 def main():
     try:
@@ -25,42 +55,48 @@ def main():
 
     url = os.environ.get('TARGET_URL', 'http://127.0.0.1:8000/index.html')
     out_dir = Path(__file__).resolve().parent
+    out_jsonl = out_dir / 'headless_output.jsonl'
     out_json = out_dir / 'headless_output.json'
     out_png = out_dir / 'headless_screenshot.png'
 
-    events = {
-        'console': [],
-        'page_errors': [],
-        'requests': [],
-        'responses': []
-    }
+    # events go straight to disk as they fire instead of accumulating in lists
+    stream = out_jsonl.open('wb', buffering=1 << 20)
 
-    with sync_playwright() as p:
+    def emit(kind, event):
+        record = {'kind': kind, **event}
+        if orjson is not None:
+            stream.write(orjson.dumps(record) + b'\n')
+        else:
+            stream.write(json.dumps(record).encode('utf-8') + b'\n')
+
+    extras = {}
+
+    with sync_playwright() as p, stream:
         browser = p.chromium.launch(headless=True)
         context = browser.new_context()
         page = context.new_page()
 
         def on_console(msg):
             try:
-                events['console'].append({
+                emit('console', {
                     'type': msg.type,
                     'text': msg.text,
                     'location': msg.location
                 })
             except Exception as e:
-                events['console'].append({'type': 'error', 'text': str(e)})
+                emit('console', {'type': 'error', 'text': str(e)})
 
         def on_page_error(exc):
-            events['page_errors'].append({'error': str(exc)})
+            emit('page_errors', {'error': str(exc)})
 
         def on_request(request):
-            events['requests'].append({'url': request.url, 'method': request.method, 'resource_type': request.resource_type})
+            emit('requests', {'url': request.url, 'method': request.method, 'resource_type': request.resource_type})
 
         def on_response(response):
             try:
-                events['responses'].append({'url': response.url, 'status': response.status, 'status_text': response.status_text})
+                emit('responses', {'url': response.url, 'status': response.status, 'status_text': response.status_text})
             except Exception as e:
-                events['responses'].append({'url': response.url, 'error': str(e)})
+                emit('responses', {'url': response.url, 'error': str(e)})
 
         page.on('console', on_console)
         page.on('pageerror', on_page_error)
@@ -78,15 +114,14 @@ def main():
         # gather DOM snapshot of body length
         try:
             body_html = page.evaluate("() => document.documentElement.outerHTML")
-            events['dom_length'] = len(body_html)
+            extras['dom_length'] = len(body_html)
         except Exception as e:
-            events['dom_error'] = str(e)
+            extras['dom_error'] = str(e)
 
-        with open(out_json, 'w', encoding='utf-8') as f:
-            json.dump(events, f, indent=2)
-
-        print('Saved:', out_json, out_png)
         browser.close()
 
+    write_legacy_json(out_jsonl, out_json, extras)
+    print('Saved:', out_jsonl, out_json, out_png)
+
 if __name__ == '__main__':
     main()
@@ -1,31 +1,34 @@
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 import json
 
 URL = "http://127.0.0.1:8000/index.html"
 INPUTS = ["D.C.", "DC", "d.c.", "washington dc", "medstar d.c."]
 
-results = []
+# Fill + click + read every query in one page-side call. The Analyze click
+# handler renders #facility-analysis-result synchronously, so no per-query
+# sleeps or extra round-trips are needed.
+BATCH_ANALYZE_JS = """(queries) => {
+    const input = document.querySelector('#other-hospital-input');
+    const btn = document.querySelector('#check-facility-btn');
+    const result = document.querySelector('#facility-analysis-result');
+    return queries.map(q => {
+        input.value = q;
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+        btn.click();
+        return {input: q, html: result.innerHTML, text: result.innerText};
+    });
+}"""
 
 with sync_playwright() as p:
     browser = p.chromium.launch(headless=True)
     page = browser.new_page()
     page.goto(URL)
-    page.wait_for_timeout(1000)
-    for q in INPUTS:
-        try:
-            page.fill('#other-hospital-input', q)
-        except Exception:
-            # try focusing then typing
-            page.click('#other-hospital-input')
-            page.fill('#other-hospital-input', q)
-        # click analyze
-        page.click('#check-facility-btn')
-        # wait for result area to update
-        page.wait_for_selector('#facility-analysis-result')
-        page.wait_for_timeout(500)
-        html = page.inner_html('#facility-analysis-result')
-        text = page.inner_text('#facility-analysis-result')
-        results.append({"input": q, "html": html, "text": text})
+    # the analyzer exposes its items once aliases are loaded and the click handler is bound
+    try:
+        page.wait_for_function("() => Array.isArray(window.__analyzer_items)", timeout=10000)
+    except PlaywrightTimeoutError:
+        pass
+    results = page.evaluate(BATCH_ANALYZE_JS, INPUTS)
     browser.close()
 
 out_path = 'tools/headless_dc_results.json'
@@ -3,13 +3,25 @@
 Usage: python tools/import_and_enrich.py
 """
 import csv
+import filecmp
 import json
 import os
 import subprocess
+try:
+    import orjson
+except Exception:
+    orjson = None
 ROOT = os.path.dirname(os.path.dirname(__file__))
 CSV_PATH = os.path.join(ROOT, 'tools', 'seed_facilities.csv')
 OUT_JSON = os.path.join(ROOT, 'data', 'external_facilities.json')
 
+# id slugs: drop apostrophes/commas/periods, then collapse whitespace and map ' ' -> '-', '&' -> 'and'
+_SLUG_DROP = str.maketrans('', '', "',.")
+_SLUG_MAP = str.maketrans({' ': '-', '&': 'and'})
+
+def slugify(name):
+    return ' '.join(name.lower().translate(_SLUG_DROP).split()).translate(_SLUG_MAP)
+
 def row_to_record(row):
     name = row.get('name')
     aliases = [a.strip() for a in (row.get('aliases') or '').split('|') if a.strip()]
@@ -40,14 +52,22 @@ def main():
             rec = row_to_record(r)
             # derive id from name if possible
             if rec['name']['value']:
-                rec['id'] = rec['name']['value'].lower().replace("'","").replace(',', '').replace('.', '').replace('  ',' ').replace(' ', '-').replace('&','and')
+                rec['id'] = slugify(rec['name']['value'])
             records.append(rec)
     os.makedirs(os.path.dirname(OUT_JSON), exist_ok=True)
-    with open(OUT_JSON + '.NEW', 'w', encoding='utf-8') as f:
-        json.dump(records, f, indent=2, ensure_ascii=False)
-    # move into place
-    os.replace(OUT_JSON + '.NEW', OUT_JSON)
-    print('Wrote', OUT_JSON)
+    if orjson is not None:
+        with open(OUT_JSON + '.NEW', 'wb') as f:
+            f.write(orjson.dumps(records, option=orjson.OPT_INDENT_2))
+    else:
+        with open(OUT_JSON + '.NEW', 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2, ensure_ascii=False)
+    # move into place unless nothing changed, so the existing file keeps its mtime
+    if os.path.exists(OUT_JSON) and filecmp.cmp(OUT_JSON + '.NEW', OUT_JSON, shallow=False):
+        os.remove(OUT_JSON + '.NEW')
+        print('Unchanged', OUT_JSON)
+    else:
+        os.replace(OUT_JSON + '.NEW', OUT_JSON)
+        print('Wrote', OUT_JSON)
     # run enrichment script
     enrich_script = os.path.join(ROOT, 'tools', 'enrich_facilities.py')
     if os.path.exists(enrich_script):
@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
 import json
+from itertools import islice
 from pathlib import Path
+try:
+    import ijson
+except Exception:
+    ijson = None
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 P = Path(__file__).resolve().parents[1] / 'data' / 'external_facilities.enriched.json'
-data = json.loads(P.read_text(encoding='utf-8'))
-for i, rec in enumerate(data[:20], 1):
+
+def first_records(n):
+    # stream just the first n records when ijson is available
+    if ijson is not None:
+        with P.open('rb', buffering=1 << 20) as fp:
+            return list(islice(ijson.items(fp, 'item', use_float=True), n))
+    if orjson is not None:
+        return orjson.loads(P.read_bytes())[:n]
+    return json.loads(P.read_text(encoding='utf-8'))[:n]
+
+for i, rec in enumerate(first_records(20), 1):
     name = rec.get('name', {}).get('value', '')
     avg = rec.get('program_details', {}).get('average_therapy_hours_per_day', {}).get('value')
     carf = rec.get('specializations', {}).get('carf_accreditations', {}).get('brain_injury', {}).get('value')